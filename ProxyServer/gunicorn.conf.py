@@ -0,0 +1,23 @@
+# Gunicorn configuration for the ProxyServer.
+# Usage (from ProxyServer/): gunicorn -c gunicorn.conf.py app:app
+import os
+import multiprocessing
+
+chdir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src')
+
+# Only nginx talks to the app directly
+bind = os.getenv('PROXY_BIND', '127.0.0.1:5001')
+
+# One process per core; each worker logs in once and serves requests on as
+# many threads as it has HSM sessions.
+workers = int(os.getenv('PROXY_WORKERS', multiprocessing.cpu_count()))
+worker_class = 'gthread'
+threads = int(os.getenv('HSM_SESSION_POOL_SIZE', '4'))
+timeout = int(os.getenv('PROXY_TIMEOUT', '60'))
+
+# PKCS#11 sessions must not be inherited across fork
+preload_app = False
+
+accesslog = '-'
+errorlog = '-'
+loglevel = os.getenv('PROXY_LOG_LEVEL', 'info')
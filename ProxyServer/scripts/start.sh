@@ -9,8 +9,13 @@ if [ -d "venv" ]; then
 fi
 
 # Start Python App
+# PROXY_SERVER_MODE=async serves the asyncio variant (src/async_app.py) on aiohttp workers
 echo "Starting Python App..."
-nohup python3 src/app.py > app.log 2>&1 &
+if [ "$PROXY_SERVER_MODE" = "async" ]; then
+    nohup gunicorn -c gunicorn.conf.py -k aiohttp.GunicornWebWorker async_app:app > app.log 2>&1 &
+else
+    nohup gunicorn -c gunicorn.conf.py app:app > app.log 2>&1 &
+fi
 echo $! > app.pid
 
 # Start Nginx
@@ -2,13 +2,19 @@ import os
 import base64
 from flask import Flask, request, jsonify
 from dotenv import load_dotenv
-from services.hsm_service import HsmService
 
-# Load Env
+# Load Env (before the services read their configuration)
 load_dotenv()
 
+from services.hsm_service import HsmService
+from services.emulated_hsm_service import EmulatedHsmService
+from services.tracing import tracer
+
 app = Flask(__name__)
-hsm_service = HsmService()
+if os.getenv('HSM_BACKEND') == 'emulator':
+    hsm_service = EmulatedHsmService.from_env()
+else:
+    hsm_service = HsmService()
 
 @app.route('/health', methods=['GET'])
 def health():
@@ -23,7 +29,8 @@ def encrypt():
              return jsonify({'error': 'plaintext field required'}), 400
         
         plaintext = base64.b64decode(plaintext_b64)
-        ciphertext = hsm_service.encrypt(plaintext)
+        with tracer.span('proxy.encrypt', traceparent=request.headers.get('traceparent')):
+            ciphertext = hsm_service.encrypt(plaintext)
         ciphertext_b64 = base64.b64encode(ciphertext).decode('utf-8')
         
         return jsonify({'ciphertext': ciphertext_b64})
@@ -39,12 +46,22 @@ def decrypt():
              return jsonify({'error': 'ciphertext field required'}), 400
         
         ciphertext = base64.b64decode(ciphertext_b64)
-        plaintext = hsm_service.decrypt(ciphertext)
+        with tracer.span('proxy.decrypt', traceparent=request.headers.get('traceparent')):
+            plaintext = hsm_service.decrypt(ciphertext)
         plaintext_b64 = base64.b64encode(plaintext).decode('utf-8')
         
         return jsonify({'plaintext': plaintext_b64})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/debug/traces', methods=['GET'])
+def debug_traces():
+    # Recent spans from this worker's in-memory buffer (TRACE_EXPORTER=memory)
+    buffer = tracer.ring_buffer
+    if buffer is None:
+        return jsonify({'error': 'In-memory trace buffer is disabled'}), 404
+    spans = buffer.spans(trace_id=request.args.get('traceId'), limit=request.args.get('limit', type=int))
+    return jsonify({'spans': spans})
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5001)
@@ -0,0 +1,98 @@
+import os
+import base64
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from aiohttp import web
+from dotenv import load_dotenv
+
+# Load Env (before the services read their configuration)
+load_dotenv()
+
+from services.hsm_service import HsmService
+from services.emulated_hsm_service import EmulatedHsmService
+from services.tracing import tracer
+
+# asyncio variant of app.py: requests are served on an event loop and the
+# blocking PKCS#11 calls run on an executor sized to the HSM session pool,
+# so calls queue for a free session instead of tying up one thread each.
+if os.getenv('HSM_BACKEND') == 'emulator':
+    hsm_service = EmulatedHsmService.from_env()
+else:
+    hsm_service = HsmService()
+hsm_executor = ThreadPoolExecutor(max_workers=hsm_service.pool_size, thread_name_prefix='hsm')
+
+
+async def run_hsm(func, data):
+    loop = asyncio.get_running_loop()
+    # Carry the current trace context over to the executor thread
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(hsm_executor, context.run, func, data)
+
+
+async def health(request):
+    return web.json_response({'status': 'ok'})
+
+
+async def encrypt(request):
+    try:
+        data = await request.json()
+        plaintext_b64 = data.get('plaintext')
+        if not plaintext_b64:
+            return web.json_response({'error': 'plaintext field required'}, status=400)
+
+        plaintext = base64.b64decode(plaintext_b64)
+        with tracer.span('proxy.encrypt', traceparent=request.headers.get('traceparent')):
+            ciphertext = await run_hsm(hsm_service.encrypt, plaintext)
+        ciphertext_b64 = base64.b64encode(ciphertext).decode('utf-8')
+
+        return web.json_response({'ciphertext': ciphertext_b64})
+    except Exception as e:
+        return web.json_response({'error': str(e)}, status=500)
+
+
+async def decrypt(request):
+    try:
+        data = await request.json()
+        ciphertext_b64 = data.get('ciphertext')
+        if not ciphertext_b64:
+            return web.json_response({'error': 'ciphertext field required'}, status=400)
+
+        ciphertext = base64.b64decode(ciphertext_b64)
+        with tracer.span('proxy.decrypt', traceparent=request.headers.get('traceparent')):
+            plaintext = await run_hsm(hsm_service.decrypt, ciphertext)
+        plaintext_b64 = base64.b64encode(plaintext).decode('utf-8')
+
+        return web.json_response({'plaintext': plaintext_b64})
+    except Exception as e:
+        return web.json_response({'error': str(e)}, status=500)
+
+
+async def debug_traces(request):
+    # Recent spans from this worker's in-memory buffer (TRACE_EXPORTER=memory)
+    buffer = tracer.ring_buffer
+    if buffer is None:
+        return web.json_response({'error': 'In-memory trace buffer is disabled'}, status=404)
+    limit = request.query.get('limit')
+    spans = buffer.spans(trace_id=request.query.get('traceId'), limit=int(limit) if limit else None)
+    return web.json_response({'spans': spans})
+
+
+async def shutdown_executor(app):
+    hsm_executor.shutdown(wait=True)
+
+
+def create_app():
+    app = web.Application()
+    app.router.add_get('/health', health)
+    app.router.add_post('/encrypt', encrypt)
+    app.router.add_post('/decrypt', decrypt)
+    app.router.add_get('/debug/traces', debug_traces)
+    app.on_cleanup.append(shutdown_executor)
+    return app
+
+
+app = create_app()
+
+if __name__ == '__main__':
+    web.run_app(app, host='0.0.0.0', port=int(os.getenv('PROXY_PORT', '5001')))
@@ -0,0 +1,153 @@
+import os
+import math
+import time
+import random
+import secrets
+import threading
+import logging
+from cryptography.hazmat.primitives.keywrap import aes_key_wrap, aes_key_unwrap
+
+logger = logging.getLogger(__name__)
+
+
+class HsmEmulatorError(Exception):
+    """Raised for emulated device failures (session exhaustion, injected errors)."""
+    pass
+
+
+class EmulatedHsmService:
+    """
+    HSM emulator used in place of HsmService when HSM_BACKEND=emulator, so the
+    proxy can be load tested without hardware. Wraps with real
+    AES key wrap (RFC 3394, same as CKM_AES_KEY_WRAP on Luna) under a local
+    KEK and models device behaviour: per-call latency drawn from a
+    distribution, a max concurrent sessions limit, an ops/sec cap and an
+    injected error rate.
+
+    latency: 'fixed' | 'uniform' | 'normal' | 'lognormal'
+    max_ops_per_sec: 0 disables the throughput cap.
+    """
+
+    def __init__(self, key_file='emulated_kek.key', latency='fixed', latency_ms=0.0, latency_stddev_ms=0.0,
+                 max_sessions=16, session_timeout=5.0, max_ops_per_sec=0, error_rate=0.0, seed=None):
+        if latency not in ('fixed', 'uniform', 'normal', 'lognormal'):
+            raise ValueError(f"Unknown latency distribution '{latency}'")
+
+        self.key_file = key_file
+        self.latency = latency
+        self.latency_ms = latency_ms
+        self.latency_stddev_ms = latency_stddev_ms
+        self.max_sessions = max_sessions
+        self.pool_size = max_sessions
+        self.session_timeout = session_timeout
+        self.max_ops_per_sec = max_ops_per_sec
+        self.error_rate = error_rate
+
+        self.kek = self._load_or_generate_kek()
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+        self._sessions = threading.BoundedSemaphore(max_sessions)
+
+        # Token bucket for the ops/sec cap. It holds at least one token so
+        # rates below 1 op/s still let a call through every 1/rate seconds.
+        self._rate_lock = threading.Lock()
+        self._bucket_size = max(1.0, float(max_ops_per_sec))
+        self._tokens = self._bucket_size
+        self._last_refill = time.monotonic()
+
+        logger.info(f"HSM emulator ready (latency={latency} {latency_ms}ms, sessions={max_sessions}, "
+                    f"max_ops={max_ops_per_sec or 'unlimited'}/s, error_rate={error_rate})")
+
+    @classmethod
+    def from_env(cls):
+        seed = os.getenv('HSM_EMULATOR_SEED')
+        return cls(
+            key_file=os.getenv('HSM_EMULATOR_KEK_FILE', 'emulated_kek.key'),
+            latency=os.getenv('HSM_EMULATOR_LATENCY', 'fixed'),
+            latency_ms=float(os.getenv('HSM_EMULATOR_LATENCY_MS', '0')),
+            latency_stddev_ms=float(os.getenv('HSM_EMULATOR_LATENCY_STDDEV_MS', '0')),
+            max_sessions=int(os.getenv('HSM_EMULATOR_MAX_SESSIONS', '16')),
+            session_timeout=float(os.getenv('HSM_EMULATOR_SESSION_TIMEOUT', '5')),
+            max_ops_per_sec=float(os.getenv('HSM_EMULATOR_MAX_OPS', '0')),
+            error_rate=float(os.getenv('HSM_EMULATOR_ERROR_RATE', '0')),
+            seed=int(seed) if seed else None,
+        )
+
+    def _load_or_generate_kek(self):
+        if os.path.exists(self.key_file):
+            with open(self.key_file, 'rb') as f:
+                logger.info(f"Loaded existing emulator KEK from {self.key_file}")
+                return f.read()
+
+        logger.info("Generating new emulator KEK")
+        kek = secrets.token_bytes(32)
+        try:
+            with open(self.key_file, 'wb') as f:
+                f.write(kek)
+        except Exception as e:
+            logger.error(f"Failed to save emulator KEK: {e}")
+        return kek
+
+    def _sample_latency(self):
+        with self._random_lock:
+            if self.latency == 'uniform':
+                ms = self._random.uniform(max(0.0, self.latency_ms - self.latency_stddev_ms),
+                                          self.latency_ms + self.latency_stddev_ms)
+            elif self.latency == 'normal':
+                ms = self._random.gauss(self.latency_ms, self.latency_stddev_ms)
+            elif self.latency == 'lognormal' and self.latency_ms > 0:
+                # Parameterised by the mean and stddev of the resulting latency, not of the log
+                variance = self.latency_stddev_ms ** 2
+                sigma2 = math.log(1 + variance / self.latency_ms ** 2)
+                mu = math.log(self.latency_ms) - sigma2 / 2
+                ms = self._random.lognormvariate(mu, sigma2 ** 0.5)
+            else:
+                ms = self.latency_ms
+        return max(0.0, ms) / 1000.0
+
+    def _should_fail(self):
+        if self.error_rate <= 0:
+            return False
+        with self._random_lock:
+            return self._random.random() < self.error_rate
+
+    def _throttle(self):
+        if self.max_ops_per_sec <= 0:
+            return
+        while True:
+            with self._rate_lock:
+                now = time.monotonic()
+                self._tokens = min(self._bucket_size,
+                                   self._tokens + (now - self._last_refill) * self.max_ops_per_sec)
+                self._last_refill = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.max_ops_per_sec
+            time.sleep(wait)
+
+    def _call(self, operation, data):
+        if not self._sessions.acquire(timeout=self.session_timeout):
+            raise HsmEmulatorError(f"CKR_SESSION_COUNT: all {self.max_sessions} emulated sessions busy")
+        try:
+            self._throttle()
+            time.sleep(self._sample_latency())
+            if self._should_fail():
+                raise HsmEmulatorError("CKR_DEVICE_ERROR (injected)")
+            return operation(self.kek, data)
+        finally:
+            self._sessions.release()
+
+    def encrypt(self, plaintext: bytes) -> bytes:
+        try:
+            return self._call(aes_key_wrap, plaintext)
+        except Exception as e:
+            logger.error(f"Emulated HSM Encrypt (Wrap) failed: {e}")
+            raise
+
+    def decrypt(self, ciphertext: bytes) -> bytes:
+        try:
+            return self._call(aes_key_unwrap, ciphertext)
+        except Exception as e:
+            logger.error(f"Emulated HSM Decrypt (Unwrap) failed: {e}")
+            raise
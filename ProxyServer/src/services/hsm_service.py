@@ -1,5 +1,8 @@
 import os
+import queue
 import logging
+from contextlib import contextmanager
+from .tracing import tracer
 try:
     import PyKCS11
 except ImportError:
@@ -14,8 +17,11 @@ class HsmService:
         self.slot_id = int(os.getenv('HSM_SLOT_ID', '1'))
         self.pin = os.getenv('HSM_PIN', '12341234')
         self.label = os.getenv('HSM_LABEL', 'master_key')
+        self.pool_size = max(1, int(os.getenv('HSM_SESSION_POOL_SIZE', '4')))
         self.session = None
         self.pkcs11 = None
+        self._sessions = queue.Queue()
+        self._all_sessions = []
 
         self._initialize()
 
@@ -29,16 +35,34 @@ class HsmService:
             self.pkcs11.load(self.lib_path)
             self.session = self.pkcs11.openSession(self.slot_id, PyKCS11.CKF_SERIAL_SESSION | PyKCS11.CKF_RW_SESSION)
             self.session.login(self.pin)
-            logger.info(f"Connected to HSM at slot {self.slot_id} using lib {self.lib_path}")
+            # Login state is shared by every session the application opens on the token,
+            # so the remaining pool sessions need no login of their own.
+            self._all_sessions.append(self.session)
+            for _ in range(self.pool_size - 1):
+                self._all_sessions.append(
+                    self.pkcs11.openSession(self.slot_id, PyKCS11.CKF_SERIAL_SESSION | PyKCS11.CKF_RW_SESSION))
+            for session in self._all_sessions:
+                self._sessions.put(session)
+            logger.info(f"Connected to HSM at slot {self.slot_id} using lib {self.lib_path} ({self.pool_size} sessions)")
         except Exception as e:
             logger.error(f"Failed to initialize HSM: {e}")
-            self.session = None
+            self._close_sessions()
 
-    def _find_key(self):
+    @contextmanager
+    def _borrow_session(self):
+        # PKCS#11 sessions are not safe for concurrent operations; each call gets one to itself
+        with tracer.span('pkcs11.session_wait'):
+            session = self._sessions.get()
+        try:
+            yield session
+        finally:
+            self._sessions.put(session)
+
+    def _find_key(self, session):
         if not self.session:
             raise RuntimeError("HSM session not active")
         
-        keys = self.session.findObjects([
+        keys = session.findObjects([
             (PyKCS11.CKA_CLASS, PyKCS11.CKO_SECRET_KEY),
             (PyKCS11.CKA_LABEL, self.label)
         ])
@@ -53,9 +77,10 @@ class HsmService:
              return plaintext[::-1]
 
         try:
-            kek_handle = self._find_key()
-            mechanism = PyKCS11.Mechanism(PyKCS11.CKM_AES_KEY_WRAP)
-            wrapped_data = self.session.encrypt(kek_handle, plaintext, mechanism)
+            with self._borrow_session() as session, tracer.span('pkcs11.encrypt', slot=self.slot_id):
+                kek_handle = self._find_key(session)
+                mechanism = PyKCS11.Mechanism(PyKCS11.CKM_AES_KEY_WRAP)
+                wrapped_data = session.encrypt(kek_handle, plaintext, mechanism)
             return bytes(wrapped_data)
         except Exception as e:
             logger.error(f"HSM Encrypt failed: {e}")
@@ -68,18 +93,29 @@ class HsmService:
              return ciphertext[::-1]
 
         try:
-            kek_handle = self._find_key()
-            mechanism = PyKCS11.Mechanism(PyKCS11.CKM_AES_KEY_WRAP)
-            decrypted_data = self.session.decrypt(kek_handle, list(ciphertext), mechanism)
+            with self._borrow_session() as session, tracer.span('pkcs11.decrypt', slot=self.slot_id):
+                kek_handle = self._find_key(session)
+                mechanism = PyKCS11.Mechanism(PyKCS11.CKM_AES_KEY_WRAP)
+                decrypted_data = session.decrypt(kek_handle, list(ciphertext), mechanism)
             return bytes(decrypted_data)
         except Exception as e:
             logger.error(f"HSM Decrypt failed: {e}")
             raise
 
-    def __del__(self):
+    def _close_sessions(self):
         if self.session:
             try:
                 self.session.logout()
-                self.session.closeSession()
             except:
                 pass
+        for session in self._all_sessions:
+            try:
+                session.closeSession()
+            except:
+                pass
+        self._all_sessions = []
+        self._sessions = queue.Queue()
+        self.session = None
+
+    def __del__(self):
+        self._close_sessions()
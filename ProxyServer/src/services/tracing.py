@@ -0,0 +1,191 @@
+import os
+import json
+import time
+import secrets
+import threading
+import functools
+import contextvars
+import logging
+from collections import deque
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+_current_span = contextvars.ContextVar('current_span', default=None)
+
+
+class Span:
+    def __init__(self, name, trace_id, parent_id, attributes):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.attributes = dict(attributes)
+        self.start_time = time.time()
+        self._start = time.perf_counter()
+        self.duration_ms = None
+        self.error = None
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def finish(self):
+        self.duration_ms = (time.perf_counter() - self._start) * 1000
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'traceId': self.trace_id,
+            'spanId': self.span_id,
+            'parentId': self.parent_id,
+            'startTime': self.start_time,
+            'durationMs': round(self.duration_ms, 3) if self.duration_ms is not None else None,
+            'attributes': self.attributes,
+            'error': self.error,
+        }
+
+
+class RingBufferExporter:
+    """Keeps the most recent spans in memory for the debug endpoint."""
+
+    def __init__(self, size=1024):
+        self._spans = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def export(self, span):
+        with self._lock:
+            self._spans.append(span.to_dict())
+
+    def spans(self, trace_id=None, limit=None):
+        with self._lock:
+            spans = list(self._spans)
+        if trace_id:
+            spans = [s for s in spans if s['traceId'] == trace_id]
+        if limit:
+            spans = spans[-limit:]
+        return spans
+
+
+class JsonlExporter:
+    """Appends one JSON object per finished span to a local file."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, span):
+        line = json.dumps(span.to_dict()) + '\n'
+        with self._lock:
+            with open(self.path, 'a') as f:
+                f.write(line)
+
+
+class Tracer:
+    """
+    Minimal request-scoped tracer. Spans nest through a context variable and
+    are handed to the exporters when they finish. Trace context crosses the
+    proxy hop as a W3C `traceparent` header.
+    """
+
+    def __init__(self, exporters=()):
+        self.exporters = list(exporters)
+
+    @classmethod
+    def from_env(cls):
+        exporters = []
+        for name in os.getenv('TRACE_EXPORTER', 'memory').split(','):
+            name = name.strip()
+            if name == 'memory':
+                exporters.append(RingBufferExporter(int(os.getenv('TRACE_BUFFER_SIZE', '1024'))))
+            elif name == 'jsonl':
+                exporters.append(JsonlExporter(os.getenv('TRACE_FILE', 'traces.jsonl')))
+            elif name and name != 'none':
+                logger.warning(f"Unknown trace exporter '{name}' ignored")
+        return cls(exporters)
+
+    @property
+    def ring_buffer(self):
+        for exporter in self.exporters:
+            if isinstance(exporter, RingBufferExporter):
+                return exporter
+        return None
+
+    @contextmanager
+    def span(self, name, traceparent=None, **attributes):
+        """
+        Opens a child of the current span. `traceparent` continues a trace
+        started in another process when there is no local parent.
+        """
+        parent = _current_span.get()
+        if parent is not None:
+            trace_id, parent_id = parent.trace_id, parent.span_id
+        else:
+            trace_id, parent_id = parse_traceparent(traceparent) or (secrets.token_hex(16), None)
+
+        span = Span(name, trace_id, parent_id, attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except Exception as e:
+            span.error = describe_error(e)
+            raise
+        finally:
+            span.finish()
+            _current_span.reset(token)
+            self._export(span)
+
+    def traced(self, name):
+        """Decorator that runs the wrapped function inside a span."""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def mark_error(self, error):
+        """
+        Records an error on the current span, for handlers that catch an
+        exception and turn it into an error response instead of raising.
+        """
+        span = _current_span.get()
+        if span is not None:
+            span.error = describe_error(error)
+
+    def _export(self, span):
+        for exporter in self.exporters:
+            try:
+                exporter.export(span)
+            except Exception as e:
+                logger.error(f"Failed to export span '{span.name}': {e}")
+
+    def inject_headers(self, headers=None):
+        """Adds the current trace context to outgoing HTTP headers."""
+        headers = {} if headers is None else headers
+        span = _current_span.get()
+        if span is not None:
+            headers['traceparent'] = f"00-{span.trace_id}-{span.span_id}-01"
+        return headers
+
+
+def describe_error(error):
+    # Some exceptions carry no message (cryptography's InvalidTag on a wrong
+    # KEK), so the type name keeps the recorded error non-empty
+    if isinstance(error, BaseException):
+        message = str(error)
+        return f"{type(error).__name__}: {message}" if message else type(error).__name__
+    return str(error)
+
+
+def parse_traceparent(header):
+    """Returns (trace_id, parent_span_id) from a W3C traceparent header, or None if invalid."""
+    if not header:
+        return None
+    parts = header.strip().split('-')
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    return parts[1], parts[2]
+
+
+tracer = Tracer.from_env()
@@ -1,15 +1,19 @@
 import os
-from dotenv import load_dotenv
 
-load_dotenv()
+# python-dotenv is only imported when there is a .env file to load
+_env_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.env')
+if os.path.exists(_env_file):
+    from dotenv import load_dotenv
+    load_dotenv(_env_file)
 
 import base64
+from contextlib import nullcontext
 from flask import Flask, render_template, jsonify, request, send_from_directory
 from src.services.file_storage_service import FileStorageService
-from src.services.hsm_service import HsmService, SimulatedHsmService, RealHsmService
-from src.services.remote_hsm_service import RemoteHsmService
-
-from src.services.dek_service import DekService
+from src.services.encryption_manifest import EncryptionManifest
+from src.services.hsm_registry import HsmRegistry
+from src.services.hsm_config_store import HsmConfigStore
+from src.services.tracing import tracer, describe_error
 from src.services.file_encryption_service import FileEncryptionService
 
 import logging
@@ -27,13 +31,93 @@ logger = logging.getLogger(__name__)
 if not os.path.exists(app.config['DATA_DIR']):
     os.makedirs(app.config['DATA_DIR'])
 
+def resolve_hsm_config(hsm_type, data):
+    """Builds the backend configuration for hsm_type from request data, falling back to .env defaults."""
+    if hsm_type in ('LUNA', 'PSE'):
+        return {
+            'pin': data.get('pin', os.getenv(f'{hsm_type}_HSM_PIN', '')),
+            'label': data.get('label', os.getenv(f'{hsm_type}_HSM_LABEL', 'master_key')),
+            'slot_id': data.get('slotId', int(os.getenv(f'{hsm_type}_HSM_SLOT', '1'))),
+        }
+    if hsm_type == 'REMOTE':
+        return {
+            'url': os.getenv('REMOTE_HSM_URL', 'https://localhost:8443'),
+            'client_cert': os.getenv('REMOTE_HSM_CLIENT_CERT', 'ProxyServer/certs/client.crt'),
+            'client_key': os.getenv('REMOTE_HSM_CLIENT_KEY', 'ProxyServer/certs/client.key'),
+            'ca_cert': os.getenv('REMOTE_HSM_CA_CERT', 'ProxyServer/certs/ca.crt'),
+        }
+    return {}
+
+def create_hsm_service(hsm_type, config):
+    """
+    Factory used by the HSM registry to build a new backend. Backend modules
+    (and PyKCS11, requests, cryptography) are imported only once selected.
+    """
+    if hsm_type in ('LUNA', 'PSE'):
+        from src.services.hsm_service import RealHsmService
+    if hsm_type == 'LUNA':
+        lib_path = os.getenv('LUNA_LIB_PATH', '/opt/safenet/lunaclient/lib/libCryptoki2_64.so')
+        new_hsm = RealHsmService(lib_path=lib_path, label=config['label'], slot_id=config['slot_id'])
+        new_hsm.login(config['pin'])
+        return new_hsm
+    if hsm_type == 'PSE':
+        pse_lib_path = os.getenv('PSE_LIB_PATH', '/opt/safenet/protecttoolkit7/ptk/lib/libcryptoki.so')
+        new_hsm = RealHsmService(lib_path=pse_lib_path, label=config['label'], slot_id=config['slot_id'])
+        new_hsm.login(config['pin'])
+        return new_hsm
+    if hsm_type == 'REMOTE':
+        from src.services.remote_hsm_service import RemoteHsmService
+        return RemoteHsmService(url=config['url'], client_cert_path=config['client_cert'],
+                                client_key_path=config['client_key'], ca_cert_path=config['ca_cert'])
+    if hsm_type == 'EMULATED':
+        # Latency, session and throughput limits come from HSM_EMULATOR_* variables
+        from src.services.emulated_hsm_service import EmulatedHsmService
+        return EmulatedHsmService.from_env()
+    from src.services.hsm_service import SimulatedHsmService
+    return SimulatedHsmService()
+
 # Initialize Services
 # By default start with Simulated HSM. Real HSM can be enabled via settings.
-hsm_service = SimulatedHsmService()
-current_hsm_type = 'SIMULATED'
-dek_service = DekService(hsm_service)
+hsm_registry = HsmRegistry(create_hsm_service, idle_timeout=float(os.getenv('HSM_IDLE_TIMEOUT', '300')))
+hsm_registry.activate('SIMULATED', {})
+# Shared with the other worker processes so they all follow the same backend
+hsm_config_store = HsmConfigStore(os.getenv('HSM_CONFIG_STORE', os.path.join(os.getcwd(), 'hsm_config.json')),
+                                   retry_interval=float(os.getenv('HSM_CONFIG_RETRY_INTERVAL', '5')))
 file_storage_service = FileStorageService(app.config['DATA_DIR'])
 file_encryption_service = FileEncryptionService()
+# Optional: skip re-encrypting unchanged files (set ENCRYPTION_MANIFEST to the manifest path)
+encryption_manifest = EncryptionManifest(os.getenv('ENCRYPTION_MANIFEST')) if os.getenv('ENCRYPTION_MANIFEST') else None
+
+# Login failures that retrying with the same PIN cannot fix. On Luna every
+# further attempt also counts towards locking the partition.
+PIN_LOGIN_ERRORS = ('CKR_PIN_INCORRECT', 'CKR_PIN_LEN_RANGE', 'CKR_PIN_LOCKED')
+
+def env_hsm_pin(hsm_type):
+    # Every worker logs in with this PIN, so it is the only one the settings UI may use
+    return os.getenv(f'{hsm_type}_HSM_PIN', '')
+
+@app.before_request
+def sync_hsm_config():
+    # Pick up HSM switches made through another worker process
+    record = hsm_config_store.poll()
+    if record:
+        hsm_type = record['hsmType']
+        config = dict(record['config'])
+        if hsm_type in ('LUNA', 'PSE'):
+            # The PIN is never shared through the store; each worker takes it from .env
+            config['pin'] = env_hsm_pin(hsm_type)
+        try:
+            hsm_registry.activate(hsm_type, config)
+            hsm_config_store.mark_applied(record)
+        except Exception as e:
+            if any(code in str(e) for code in PIN_LOGIN_ERRORS):
+                hsm_config_store.mark_failed(record)
+                logger.critical(f"Worker {os.getpid()} rejected shared HSM config generation {record['generation']} "
+                                f"({hsm_type}): {e}. It stays on the {hsm_registry.active_type} backend and will not "
+                                f"retry; fix {hsm_type}_HSM_PIN and save the HSM settings again.")
+            else:
+                # Not marked as applied, so a later poll retries it
+                logger.error(f"Failed to apply shared HSM config ({hsm_type}): {e}")
 
 @app.route('/')
 def index():
@@ -114,98 +198,49 @@ def list_files():
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
 
+@app.route('/api/debug/traces', methods=['GET'])
+def debug_traces():
+    # Recent spans from this worker's in-memory buffer (TRACE_EXPORTER=memory)
+    buffer = tracer.ring_buffer
+    if buffer is None:
+        return jsonify({'success': False, 'message': 'In-memory trace buffer is disabled'}), 404
+    spans = buffer.spans(trace_id=request.args.get('traceId'), limit=request.args.get('limit', type=int))
+    return jsonify({'success': True, 'data': spans})
+
 @app.route('/api/hsm/status', methods=['GET'])
 def hsm_status():
-    hsm_type = 'SIMULATED'
-    if isinstance(hsm_service, RealHsmService):
-        # We need to distinguish between PSE and LUNA based on lib_path or a stored flag.
-        # simpler way: store a global hsm_type_str
-        pass 
-    
-    # Actually, let's just use a global variable or attribute since we are stateless-ish here
-    # accessing the global hsm_type variable defined effectively by config
-    return jsonify({'hsmType': current_hsm_type})
+    return jsonify({'hsmType': hsm_registry.active_type})
 
 @app.route('/api/hsm/config', methods=['POST'])
 def hsm_config():
-    global hsm_service, dek_service, current_hsm_type
     data = request.json
     
-    # New parameter hsmType: 'SIMULATED' | 'PSE' | 'LUNA' | 'REMOTE'
+    # New parameter hsmType: 'SIMULATED' | 'EMULATED' | 'PSE' | 'LUNA' | 'REMOTE'
 
     # Fallback to useHsm for backward compatibility if needed, but we are changing frontend too.
     hsm_type = data.get('hsmType', 'SIMULATED')
+    if hsm_type not in ('LUNA', 'PSE', 'REMOTE', 'EMULATED'):
+        hsm_type = 'SIMULATED'
     
-    
-    # Defaults depend on type
-    default_pin = ''
-    default_label = 'mk'
-    default_slot = 0
-    
-    if hsm_type == 'LUNA':
-        default_pin = os.getenv('LUNA_HSM_PIN', '')
-        default_label = os.getenv('LUNA_HSM_LABEL', 'master_key')
-        default_slot = int(os.getenv('LUNA_HSM_SLOT', '1'))
-    elif hsm_type == 'PSE':
-        default_pin = os.getenv('PSE_HSM_PIN', '')
-        default_label = os.getenv('PSE_HSM_LABEL', 'master_key')
-        default_slot = int(os.getenv('PSE_HSM_SLOT', '1'))
-    elif hsm_type == 'REMOTE':
-        default_label = 'remote_key'
-
-
-    pin = data.get('pin', default_pin)
-    label = data.get('label', default_label)
-    slot_id = data.get('slotId', default_slot)
-
-
     try:
-        if hsm_type == 'LUNA':
-
-            # Luna Specifics
-            lib_path = os.getenv('LUNA_LIB_PATH', '/opt/safenet/lunaclient/lib/libCryptoki2_64.so')
-
-            # Note: User provided slot and pin are used, but frontend will default them.
-            new_hsm = RealHsmService(lib_path=lib_path, label=label, slot_id=slot_id)
-            new_hsm.login(pin)
-            hsm_service = new_hsm
-            current_hsm_type = 'LUNA'
-            
-        elif hsm_type == 'PSE':
-            # PSE HSM
-            # User specified path:
-            pse_lib_path = os.getenv('PSE_LIB_PATH', '/opt/safenet/protecttoolkit7/ptk/lib/libcryptoki.so')
-
-            
-            new_hsm = RealHsmService(lib_path=pse_lib_path, label=label, slot_id=slot_id)
-            new_hsm.login(pin)
-            hsm_service = new_hsm
-            current_hsm_type = 'PSE'
-            
-        elif hsm_type == 'REMOTE':
-            # Remote Proxy HSM
-            remote_url = os.getenv('REMOTE_HSM_URL', 'https://localhost:8443')
-            client_cert = os.getenv('REMOTE_HSM_CLIENT_CERT', 'ProxyServer/certs/client.crt')
-            client_key = os.getenv('REMOTE_HSM_CLIENT_KEY', 'ProxyServer/certs/client.key')
-            ca_cert = os.getenv('REMOTE_HSM_CA_CERT', 'ProxyServer/certs/ca.crt')
-            
-            # Verify files exist, if relatively mapped
-            if not os.path.exists(client_cert):
-                 # Try absolute if relative fails or assume user knows what they are doing if absolute
-                 pass
-
-            new_hsm = RemoteHsmService(url=remote_url, client_cert_path=client_cert, client_key_path=client_key, ca_cert_path=ca_cert)
-            hsm_service = new_hsm
-            current_hsm_type = 'REMOTE'
-
-        else:
-            # SIMULATED
-
-            hsm_service = SimulatedHsmService()
-            current_hsm_type = 'SIMULATED'
-        
-        # Re-inject dependency
-        dek_service = DekService(hsm_service)
+        # Warm backends are reused per configuration; in-flight requests keep the one they started with
+        config = resolve_hsm_config(hsm_type, data)
+        if hsm_type in ('LUNA', 'PSE') and config['pin'] != env_hsm_pin(hsm_type):
+            # The other workers cannot see this PIN and would keep failing C_Login with theirs
+            return jsonify({'success': False,
+                            'message': f"HSM PIN must match {hsm_type}_HSM_PIN, which every worker logs in with"}), 400
+        # Publish first so this worker never switches to a config the others cannot see
+        previous = hsm_config_store.load()
+        hsm_config_store.save(hsm_type, config)
+        try:
+            hsm_registry.activate(hsm_type, config)
+        except Exception:
+            # Put the previous config back so the other workers do not follow a failed switch
+            if previous:
+                hsm_config_store.save(previous['hsmType'], previous['config'])
+            else:
+                hsm_config_store.save('SIMULATED', {})
+            raise
         return jsonify({'success': True})
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 400
@@ -228,47 +263,124 @@ def encrypt_select():
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
 
-@app.route('/api/encrypt/process/<file_id>', methods=['POST'])
-def encrypt_process(file_id):
-    filename = file_id # In this simple impl, ID is filename
-    try:
-        # 1. Read Original File
+def encrypt_stored_file(filename, force=False):
+    """
+    Encrypts a file in DATA_DIR into <name>.encrypted / <name>.dek and returns
+    the result data. With the manifest enabled, an input that is unchanged
+    since its outputs were written is skipped unless `force` is set.
+    """
+    encrypted_filename = filename + ".encrypted"
+    dek_filename = filename + ".dek"
+
+    if encryption_manifest is not None:
+        source_path = file_storage_service.get_file_path(filename)
+        output_paths = {
+            'encrypted': file_storage_service.get_file_path(encrypted_filename),
+            'dek': file_storage_service.get_file_path(dek_filename),
+        }
+        if not force:
+            with tracer.span('manifest.lookup', file=filename):
+                entry = encryption_manifest.lookup(filename, source_path, output_paths,
+                                                   hsm_registry.active_backend_id)
+            if entry:
+                encrypted_dek = file_storage_service.read_file(dek_filename)
+                return {
+                    'originalFilename': filename,
+                    'originalSize': entry['size'],
+                    'encryptedSize': entry['outputs']['encrypted']['size'],
+                    'encryptedFilename': encrypted_filename,
+                    'encryptedDek': base64.b64encode(encrypted_dek).decode('utf-8'),
+                    'skipped': True
+                }
+        # Taken before the read so a concurrent modification shows up on the next lookup
+        source_state = EncryptionManifest.file_state(source_path)
+
+    # 1. Read Original File
+    with tracer.span('file.read', file=filename):
         file_data = file_storage_service.read_file(filename)
-        
+    
+    with hsm_registry.acquire() as backend:
+        dek_service = backend.dek_service
+        backend_id = backend.backend_id
+
         # 2. Generate DEK
         dek = dek_service.generate_dek()
         
         # 3. Encrypt File
-        encrypted_data = file_encryption_service.encrypt_file_data(file_data, dek)
+        with tracer.span('gcm.encrypt', size=len(file_data)):
+            encrypted_data = file_encryption_service.encrypt_file_data(file_data, dek)
         
         # 4. Save Encrypted File
-        encrypted_filename = filename + ".encrypted"
-        file_storage_service.save_file(encrypted_filename, encrypted_data)
+        with tracer.span('file.write', file=encrypted_filename):
+            file_storage_service.save_file(encrypted_filename, encrypted_data)
         
         # 5. Encrypt DEK (Wrap)
         encrypted_dek = dek_service.encrypt_dek(dek)
-        
-        # 6. Save Encrypted DEK
-        dek_filename = filename + ".dek"
+    
+    # 6. Save Encrypted DEK
+    with tracer.span('file.write', file=dek_filename):
         file_storage_service.save_file(dek_filename, encrypted_dek)
-        
-        # 7. Prepare Result
-        encrypted_dek_b64 = base64.b64encode(encrypted_dek).decode('utf-8')
-        
-        return jsonify({
-            'success': True, 
-            'data': {
-                'originalFilename': filename,
-                'originalSize': len(file_data),
-                'encryptedSize': len(encrypted_data),
-                'encryptedFilename': encrypted_filename,
-                'encryptedDek': encrypted_dek_b64
-            }
-        })
+
+    # 7. Record in Manifest
+    if encryption_manifest is not None:
+        encryption_manifest.record(filename, source_state, EncryptionManifest.fingerprint_bytes(file_data),
+                                   output_paths, backend_id)
+    
+    # 8. Prepare Result
+    encrypted_dek_b64 = base64.b64encode(encrypted_dek).decode('utf-8')
+    
+    return {
+        'originalFilename': filename,
+        'originalSize': len(file_data),
+        'encryptedSize': len(encrypted_data),
+        'encryptedFilename': encrypted_filename,
+        'encryptedDek': encrypted_dek_b64,
+        'skipped': False
+    }
+
+@app.route('/api/encrypt/process/<file_id>', methods=['POST'])
+@tracer.traced('api.encrypt')
+def encrypt_process(file_id):
+    filename = file_id # In this simple impl, ID is filename
+    try:
+        result = encrypt_stored_file(filename, force=request.args.get('force') == 'true')
+        return jsonify({'success': True, 'data': result})
     except Exception as e:
         logger.error(f"Encryption failed: {e}")
+        tracer.mark_error(e)
         return jsonify({'success': False, 'message': str(e)}), 500
 
+@app.route('/api/encrypt/batch', methods=['POST'])
+@tracer.traced('api.encrypt_batch')
+def encrypt_batch():
+    data = request.get_json(silent=True) or {}
+    if not isinstance(data, dict):
+        return jsonify({'success': False, 'message': 'Request body must be a JSON object'}), 400
+    filenames = data.get('filenames')
+    if filenames is not None and not (isinstance(filenames, list) and all(isinstance(f, str) for f in filenames)):
+        return jsonify({'success': False, 'message': "'filenames' must be a list of strings"}), 400
+
+    force = data.get('force', False)
+    if not isinstance(force, bool):
+        return jsonify({'success': False, 'message': "'force' must be true or false"}), 400
+
+    # Default: every plaintext in DATA_DIR (everything that is not an encryption output)
+    if filenames is None:
+        filenames = [f for f in file_storage_service.list_files() if not f.endswith(('.encrypted', '.dek'))]
+
+    results = []
+    # One manifest write for the whole batch rather than one per file
+    with encryption_manifest.batch() if encryption_manifest is not None else nullcontext():
+        for filename in filenames:
+            try:
+                results.append({'success': True, 'data': encrypt_stored_file(filename, force=force)})
+            except Exception as e:
+                logger.error(f"Encryption failed for {filename}: {e}")
+                tracer.mark_error(f"{filename}: {describe_error(e)}")
+                results.append({'success': False, 'originalFilename': filename, 'message': str(e)})
+
+    return jsonify({'success': all(r['success'] for r in results), 'data': results})
+
 # --- Decryption Flow ---
 
 @app.route('/api/decrypt/select', methods=['POST'])
@@ -293,27 +405,34 @@ def decrypt_select():
         return jsonify({'success': False, 'message': str(e)}), 500
 
 @app.route('/api/decrypt/process/<file_id>', methods=['POST'])
+@tracer.traced('api.decrypt')
 def decrypt_process(file_id):
     try:
         # Parse composite ID
         enc_filename, dek_filename = file_id.split('|')
         
         # 1. Read Encrypted DEK
-        encrypted_dek = file_storage_service.read_file(dek_filename)
+        with tracer.span('file.read', file=dek_filename):
+            encrypted_dek = file_storage_service.read_file(dek_filename)
         
         # 2. Decrypt DEK (Unwrap)
         try:
-            dek = dek_service.decrypt_dek(encrypted_dek)
+            with hsm_registry.acquire() as backend:
+                dek = backend.dek_service.decrypt_dek(encrypted_dek)
         except Exception as e:
+             tracer.mark_error(e)
              return jsonify({'success': False, 'message': f"DeK Decryption Failed: {str(e)}"}), 500
              
         # 3. Read Encrypted File
-        encrypted_data = file_storage_service.read_file(enc_filename)
+        with tracer.span('file.read', file=enc_filename):
+            encrypted_data = file_storage_service.read_file(enc_filename)
         
         # 4. Decrypt File
         try:
-            plaintext = file_encryption_service.decrypt_file_data(encrypted_data, dek)
+            with tracer.span('gcm.decrypt', size=len(encrypted_data)):
+                plaintext = file_encryption_service.decrypt_file_data(encrypted_data, dek)
         except Exception as e:
+             tracer.mark_error(e)
              return jsonify({'success': False, 'message': f"File Decryption Failed (Bad Key?): {str(e)}"}), 500
 
         # 5. Restore Filename (Remove .encrypted)
@@ -322,7 +441,8 @@ def decrypt_process(file_id):
             original_filename += ".restored"
             
         # 6. Save Decrypted File
-        file_storage_service.save_file(original_filename, plaintext)
+        with tracer.span('file.write', file=original_filename):
+            file_storage_service.save_file(original_filename, plaintext)
         
         return jsonify({
             'success': True,
@@ -333,6 +453,7 @@ def decrypt_process(file_id):
 
     except Exception as e:
         logger.error(f"Decryption failed: {e}")
+        tracer.mark_error(e)
         return jsonify({'success': False, 'message': str(e)}), 500
 
 if __name__ == '__main__':
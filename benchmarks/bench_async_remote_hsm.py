@@ -0,0 +1,94 @@
+"""
+Load benchmark for AsyncRemoteHsmService against the asyncio ProxyServer.
+
+Starts ProxyServer/src/async_app.py in-process on the HSM emulator, issues a
+batch of concurrent DEK wraps and unwraps through AsyncRemoteHsmService and
+reports throughput. It also checks the client's guarantees: no more than
+`--concurrency` requests are ever in flight at the proxy, and requests reuse
+at most that many TCP connections instead of opening one per call.
+
+Usage: python benchmarks/bench_async_remote_hsm.py [--ops N] [--concurrency N] [--latency-ms MS]
+"""
+import os
+import sys
+import time
+import asyncio
+import secrets
+import argparse
+import tempfile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+async def run(args):
+    from aiohttp import web
+    from src.services.async_remote_hsm_service import AsyncRemoteHsmService
+    import async_app
+
+    stats = {'in_flight': 0, 'max_in_flight': 0, 'peers': set()}
+
+    @web.middleware
+    async def observe(request, handler):
+        if request.path == '/health':
+            return await handler(request)
+        stats['peers'].add(request.transport.get_extra_info('peername'))
+        stats['in_flight'] += 1
+        stats['max_in_flight'] = max(stats['max_in_flight'], stats['in_flight'])
+        try:
+            return await handler(request)
+        finally:
+            stats['in_flight'] -= 1
+
+    async_app.app.middlewares.append(observe)
+    runner = web.AppRunner(async_app.app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', args.port)
+    await site.start()
+
+    try:
+        deks = [secrets.token_bytes(32) for _ in range(args.ops)]
+        async with AsyncRemoteHsmService(f"http://127.0.0.1:{args.port}",
+                                         max_concurrency=args.concurrency) as hsm:
+            start = time.perf_counter()
+            wrapped = await hsm.encrypt_many(deks)
+            wrap_s = time.perf_counter() - start
+
+            start = time.perf_counter()
+            unwrapped = await hsm.decrypt_many(wrapped)
+            unwrap_s = time.perf_counter() - start
+    finally:
+        await runner.cleanup()
+
+    assert unwrapped == deks, "unwrapped DEKs do not match the originals"
+    print(f"wrap:   {args.ops} ops in {wrap_s:.2f} s ({args.ops / wrap_s:.0f} ops/s)")
+    print(f"unwrap: {args.ops} ops in {unwrap_s:.2f} s ({args.ops / unwrap_s:.0f} ops/s)")
+    print(f"max in flight at proxy: {stats['max_in_flight']} (limit {args.concurrency})")
+    print(f"TCP connections used:   {len(stats['peers'])} for {2 * args.ops} requests")
+
+    assert stats['max_in_flight'] <= args.concurrency, "concurrency limit exceeded"
+    assert len(stats['peers']) <= args.concurrency, "connections were not reused"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--ops', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--latency-ms', type=float, default=2.0)
+    parser.add_argument('--sessions', type=int, default=16)
+    parser.add_argument('--port', type=int, default=5099)
+    args = parser.parse_args()
+
+    # async_app reads its backend configuration at import time
+    os.environ['HSM_BACKEND'] = 'emulator'
+    os.environ['HSM_EMULATOR_LATENCY_MS'] = str(args.latency_ms)
+    os.environ['HSM_EMULATOR_MAX_SESSIONS'] = str(args.sessions)
+    os.environ.setdefault('TRACE_EXPORTER', 'none')
+    os.environ['HSM_EMULATOR_KEK_FILE'] = os.path.join(tempfile.mkdtemp(), 'emulated_kek.key')
+    sys.path.insert(0, REPO_ROOT)
+    sys.path.insert(0, os.path.join(REPO_ROOT, 'ProxyServer', 'src'))
+
+    asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+Startup benchmark for the Flask app.
+
+Imports `app` in fresh interpreters (from a scratch working directory, so no
+KEK or DATA files are reused) and reports wall-clock import time, the
+heaviest modules according to `-X importtime`, which optional heavy
+dependencies were loaded, and whether KEK material was touched at startup.
+
+Usage: python benchmarks/bench_startup.py [--runs N] [--top N]
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ('PyKCS11', 'requests', 'cryptography', 'dotenv', 'aiohttp')
+
+PROBE = f"""
+import sys, time, json
+sys.path.insert(0, {REPO_ROOT!r})
+start = time.perf_counter()
+import app
+elapsed = time.perf_counter() - start
+print(json.dumps({{
+    'import_ms': elapsed * 1000,
+    'loaded': sorted(m for m in {HEAVY_MODULES!r} if m in sys.modules),
+}}))
+"""
+
+
+def run_probe(cwd, extra_args=()):
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE='1')
+    return subprocess.run([sys.executable, *extra_args, '-c', PROBE], cwd=cwd, env=env,
+                          capture_output=True, text=True, check=True)
+
+
+def parse_importtime(stderr, top):
+    """Returns the (cumulative us, module) pairs imported directly by `app`, slowest first."""
+    # Lines look like "import time:  <self us> | <cumulative us> | <indented module>".
+    # Children are printed before their parent and indented two spaces deeper.
+    pending = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        _, cumulative_us, name = line[len('import time:'):].split('|')
+        indent = len(name) - len(name.lstrip())
+        if name.strip() == 'app':
+            children = [(us, mod) for child_indent, us, mod in pending if child_indent == indent + 2]
+            return sorted(children, reverse=True)[:top]
+        if indent == 1:
+            pending = []
+        else:
+            pending.append((indent, int(cumulative_us), name.strip()))
+    return []
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--top', type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as cwd:
+        samples = []
+        wall = []
+        for _ in range(args.runs):
+            result = run_probe(cwd)
+            data = json.loads(result.stdout.strip().splitlines()[-1])
+            samples.append(data)
+            wall.append(data['import_ms'])
+
+        kek_files = [f for f in ('simulated_kek.key', 'emulated_kek.key') if os.path.exists(os.path.join(cwd, f))]
+        importtime = run_probe(cwd, ('-X', 'importtime'))
+
+    print(f"import app ({args.runs} runs): "
+          f"min {min(wall):.1f} ms, median {statistics.median(wall):.1f} ms, max {max(wall):.1f} ms")
+    print(f"heavy modules loaded: {', '.join(samples[-1]['loaded']) or 'none'}")
+    print(f"KEK files created at startup: {', '.join(kek_files) or 'none'}")
+    print(f"top {args.top} imports made by app.py (cumulative):")
+    for cumulative_us, name in parse_importtime(importtime.stderr, args.top):
+        print(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+
+
+if __name__ == '__main__':
+    main()
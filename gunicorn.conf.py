@@ -0,0 +1,22 @@
+# Gunicorn configuration for production serving.
+# Usage: gunicorn -c gunicorn.conf.py app:app
+import os
+import multiprocessing
+
+bind = os.getenv('APP_BIND', '0.0.0.0:5000')
+
+# One process per core, each serving requests on a small thread pool
+workers = int(os.getenv('APP_WORKERS', multiprocessing.cpu_count()))
+worker_class = 'gthread'
+threads = int(os.getenv('APP_THREADS', '4'))
+
+# Large uploads (up to 2GB) and HSM calls can take a while
+timeout = int(os.getenv('APP_TIMEOUT', '300'))
+
+# PKCS#11 sessions must not be inherited across fork, so each worker
+# imports the app (and opens its own HSM backend) after forking.
+preload_app = False
+
+accesslog = '-'
+errorlog = '-'
+loglevel = os.getenv('APP_LOG_LEVEL', 'info')
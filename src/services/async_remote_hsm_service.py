@@ -0,0 +1,101 @@
+import ssl
+import base64
+import asyncio
+import logging
+import aiohttp
+from .tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncRemoteHsmService:
+    """
+    asyncio counterpart of RemoteHsmService. Keeps one mTLS connection pool
+    for its lifetime and caps outstanding calls at `max_concurrency`, so
+    large batches of DEK operations can be awaited together without a
+    thread per call. Use as `async with AsyncRemoteHsmService(...) as hsm:`.
+
+    Passing no certificate paths talks plain HTTP, for reaching the proxy
+    app directly on its loopback port (e.g. benchmarks/bench_async_remote_hsm.py).
+    """
+
+    def __init__(self, url, client_cert_path=None, client_key_path=None, ca_cert_path=None,
+                 max_concurrency=64, timeout=10):
+        self.url = url.rstrip('/')
+        self.max_concurrency = max_concurrency
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.ssl_context = None
+        if ca_cert_path:
+            self.ssl_context = ssl.create_default_context(cafile=ca_cert_path)
+            self.ssl_context.load_cert_chain(client_cert_path, client_key_path)
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._session = None
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def connect(self):
+        if self._session is None:
+            # Without a client certificate, https URLs still get default certificate verification
+            connector = aiohttp.TCPConnector(ssl=self.ssl_context or True, limit=self.max_concurrency)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+
+        # Test connection
+        try:
+            async with self._session.get(f"{self.url}/health") as resp:
+                resp.raise_for_status()
+            logger.info(f"Connected to Remote HSM at {self.url}")
+        except Exception as e:
+            logger.error(f"Failed to connect to Remote HSM: {e}")
+            # __aexit__ does not run when __aenter__ raises, so release the pool here
+            await self.close()
+            raise
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _post(self, path, payload):
+        if self._session is None:
+            raise RuntimeError("AsyncRemoteHsmService is not connected")
+
+        async with self._semaphore:
+            with tracer.span(f"remote_hsm{path.replace('/', '.')}", url=f"{self.url}{path}") as span:
+                async with self._session.post(f"{self.url}{path}", json=payload,
+                                              headers=tracer.inject_headers()) as resp:
+                    span.set_attribute('status', resp.status)
+                    resp.raise_for_status()
+                    data = await resp.json()
+
+        if 'error' in data:
+            raise Exception(data['error'])
+        return data
+
+    async def encrypt_with_kek(self, plaintext: bytes) -> bytes:
+        try:
+            plaintext_b64 = base64.b64encode(plaintext).decode('utf-8')
+            data = await self._post('/encrypt', {'plaintext': plaintext_b64})
+            return base64.b64decode(data['ciphertext'])
+        except Exception as e:
+            logger.error(f"Remote HSM Encrypt failed: {e}")
+            raise
+
+    async def decrypt_with_kek(self, ciphertext: bytes) -> bytes:
+        try:
+            ciphertext_b64 = base64.b64encode(ciphertext).decode('utf-8')
+            data = await self._post('/decrypt', {'ciphertext': ciphertext_b64})
+            return base64.b64decode(data['plaintext'])
+        except Exception as e:
+            logger.error(f"Remote HSM Decrypt failed: {e}")
+            raise
+
+    async def encrypt_many(self, plaintexts) -> list:
+        return await asyncio.gather(*(self.encrypt_with_kek(p) for p in plaintexts))
+
+    async def decrypt_many(self, ciphertexts) -> list:
+        return await asyncio.gather(*(self.decrypt_with_kek(c) for c in ciphertexts))
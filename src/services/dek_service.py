@@ -1,6 +1,7 @@
 import secrets
 import base64
 from .hsm_service import HsmService
+from .tracing import tracer
 import logging
 
 logger = logging.getLogger(__name__)
@@ -12,15 +13,18 @@ class DekService:
 
     def generate_dek(self) -> bytes:
         logger.info(f"Generating new DEK ({self.dek_size*8} bits)")
-        return secrets.token_bytes(self.dek_size)
+        with tracer.span('dek.generate'):
+            return secrets.token_bytes(self.dek_size)
 
     def encrypt_dek(self, dek: bytes) -> bytes:
         logger.debug("Encrypting DEK with HSM KEK")
-        return self.hsm_service.encrypt_with_kek(dek)
+        with tracer.span('dek.wrap', backend=type(self.hsm_service).__name__):
+            return self.hsm_service.encrypt_with_kek(dek)
 
     def decrypt_dek(self, encrypted_dek: bytes) -> bytes:
         logger.debug("Decrypting DEK with HSM KEK")
-        return self.hsm_service.decrypt_with_kek(encrypted_dek)
+        with tracer.span('dek.unwrap', backend=type(self.hsm_service).__name__):
+            return self.hsm_service.decrypt_with_kek(encrypted_dek)
 
     def encrypt_dek_to_base64(self, dek: bytes) -> str:
         encrypted_bytes = self.encrypt_dek(dek)
@@ -0,0 +1,162 @@
+import os
+import json
+import fcntl
+import hashlib
+import threading
+import logging
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class EncryptionManifest:
+    """
+    Records, per plaintext file, its size, mtime and content hash together
+    with the .encrypted / .dek outputs produced from it and the HSM backend
+    that wrapped the DEK, so unchanged inputs can be skipped on later runs.
+    Switching to a different backend (type, slot, label, proxy URL) makes
+    every entry stale, since the existing .dek files were wrapped by another KEK.
+
+    A lookup is a dict access plus a few stat() calls. The content hash
+    (BLAKE2b, streamed in chunks) is only computed when the size matches but
+    the mtime changed, e.g. after a touch or a copy that kept the contents.
+    The manifest file is shared between worker processes: it is re-read when
+    another process changes it and updated under a file lock. Inside
+    batch(), updates are buffered and written in one go when it exits.
+    """
+
+    CHUNK_SIZE = 1024 * 1024
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._stamp = None
+        # Per-thread buffer of entries while inside batch(), else unset
+        self._local = threading.local()
+
+    @classmethod
+    def fingerprint(cls, path):
+        digest = hashlib.blake2b(digest_size=32)
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(cls.CHUNK_SIZE), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    @staticmethod
+    def fingerprint_bytes(data):
+        return hashlib.blake2b(data, digest_size=32).hexdigest()
+
+    @staticmethod
+    def file_state(path):
+        st = os.stat(path)
+        return {'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+
+    def lookup(self, filename, source_path, output_paths, backend_id):
+        """
+        Returns the recorded entry if the source is unchanged, its DEK was
+        wrapped by `backend_id` and every output in `output_paths`
+        ({'encrypted': path, 'dek': path}) is still the file we wrote.
+        Returns None if the file needs to be (re-)encrypted.
+        """
+        with self._lock:
+            self._reload_if_changed()
+            entry = self._entries.get(filename)
+        if not entry or entry.get('backend') != backend_id:
+            return None
+
+        try:
+            source = self.file_state(source_path)
+            for key, path in output_paths.items():
+                if self.file_state(path) != entry['outputs'].get(key):
+                    return None
+        except FileNotFoundError:
+            return None
+
+        if source['size'] != entry['size']:
+            return None
+        if source['mtime_ns'] == entry['mtime_ns']:
+            return entry
+
+        # Same size, new mtime: only a content comparison can tell
+        if self.fingerprint(source_path) != entry['hash']:
+            return None
+        self._update(filename, dict(entry, mtime_ns=source['mtime_ns']))
+        return entry
+
+    def record(self, filename, source_state, source_hash, output_paths, backend_id):
+        """
+        Records an encryption. `source_state` is the plaintext's size/mtime
+        taken before it was read, so a concurrent modification is caught on
+        the next lookup; `backend_id` identifies the backend that wrapped the DEK.
+        """
+        entry = {
+            'backend': backend_id,
+            'size': source_state['size'],
+            'mtime_ns': source_state['mtime_ns'],
+            'hash': source_hash,
+            'outputs': {key: self.file_state(path) for key, path in output_paths.items()},
+            'files': {key: os.path.basename(path) for key, path in output_paths.items()},
+        }
+        self._update(filename, entry)
+
+    @contextmanager
+    def batch(self):
+        """
+        Buffers record() and lookup() updates made by this thread and writes
+        them with a single rewrite on exit, instead of one per file.
+        """
+        if getattr(self._local, 'pending', None) is not None:
+            yield
+            return
+        self._local.pending = {}
+        try:
+            yield
+        finally:
+            pending, self._local.pending = self._local.pending, None
+            if pending:
+                self._flush(pending)
+
+    def _update(self, filename, entry):
+        pending = getattr(self._local, 'pending', None)
+        if pending is not None:
+            pending[filename] = entry
+            return
+        self._flush({filename: entry})
+
+    def _flush(self, updates):
+        with self._lock:
+            with open(f"{self.path}.lock", 'w') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    # Merge with what other workers wrote since we last read
+                    self._reload_if_changed()
+                    self._entries.update(updates)
+                    self._write()
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _write(self):
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self._entries, f)
+        os.replace(tmp_path, self.path)
+        self._stamp = self._stat()
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def _reload_if_changed(self):
+        stamp = self._stat()
+        if stamp is None or stamp == self._stamp:
+            return
+        try:
+            with open(self.path, 'r') as f:
+                self._entries = json.load(f)
+            self._stamp = stamp
+        except (ValueError, OSError) as e:
+            logger.error(f"Failed to read encryption manifest: {e}")
@@ -1,26 +1,39 @@
 import os
-from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
-from cryptography.hazmat.backends import default_backend
 import logging
 import secrets
 
 logger = logging.getLogger(__name__)
 
+# cryptography is resolved on first use (see _load_ciphers) to keep app startup light
+_ciphers = None
+
+def _load_ciphers():
+    """Returns (Cipher, algorithms, modes, backend), importing cryptography once on first use."""
+    global _ciphers
+    if _ciphers is None:
+        from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+        from cryptography.hazmat.backends import default_backend
+        _ciphers = (Cipher, algorithms, modes, default_backend())
+    return _ciphers
+
 class FileEncryptionService:
-    def __init__(self):
-        self.backend = default_backend()
+    @property
+    def backend(self):
+        return _load_ciphers()[3]
 
     def encrypt_file_data(self, data: bytes, dek: bytes) -> bytes:
         """
         Encrypts file data using AES-GCM.
         Returns IV + Ciphertext (incl tag)
         """
+        Cipher, algorithms, modes, backend = _load_ciphers()
+
         logger.info(f"Encrypting data size: {len(data)}")
         iv = secrets.token_bytes(12)
         encryptor = Cipher(
             algorithms.AES(dek),
             modes.GCM(iv),
-            backend=self.backend
+            backend=backend
         ).encryptor()
 
         ciphertext = encryptor.update(data) + encryptor.finalize()
@@ -38,6 +51,8 @@ class FileEncryptionService:
         Decrypts file data using AES-GCM.
         Expects IV + Ciphertext + Tag
         """
+        Cipher, algorithms, modes, backend = _load_ciphers()
+
         logger.info(f"Decrypting data size: {len(encrypted_data)}")
         if len(encrypted_data) < 28:
             raise ValueError("Data too short")
@@ -49,7 +64,7 @@ class FileEncryptionService:
         decryptor = Cipher(
             algorithms.AES(dek),
             modes.GCM(iv, tag),
-            backend=self.backend
+            backend=backend
         ).decryptor()
 
         return decryptor.update(ciphertext) + decryptor.finalize()
@@ -0,0 +1,127 @@
+import os
+import json
+import time
+import fcntl
+import threading
+import logging
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class HsmConfigStore:
+    """
+    Local file that shares the active HSM configuration between worker
+    processes. Every save bumps a generation counter; workers poll the file
+    (a single stat() when nothing changed) and re-activate when they see a
+    newer generation than the one they last applied.
+
+    Secrets are never written: fields listed in SECRET_FIELDS (the HSM PIN)
+    are dropped on save, and each worker supplies them from its own
+    environment when it applies a record.
+    """
+
+    SECRET_FIELDS = ('pin',)
+
+    def __init__(self, path, retry_interval=5.0):
+        self.path = path
+        self.retry_interval = retry_interval
+        self._lock = threading.Lock()
+        self._stamp = None
+        self._generation = 0
+        self._retry_after = 0.0
+        # (generation, stamp) of the record last returned by poll()
+        self._polled = None
+
+    def load(self):
+        """Returns the current record, or None if nothing has been stored."""
+        return self._read()
+
+    def save(self, hsm_type, config):
+        config = {key: value for key, value in config.items() if key not in self.SECRET_FIELDS}
+        with self._file_lock():
+            current = self._read()
+            generation = (current['generation'] if current else 0) + 1
+            record = {'generation': generation, 'hsmType': hsm_type, 'config': config}
+
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'w') as f:
+                json.dump(record, f)
+            os.replace(tmp_path, self.path)
+
+            with self._lock:
+                self._generation = generation
+                self._stamp = self._stat()
+        logger.info(f"Stored HSM config generation {generation} ({hsm_type})")
+        return record
+
+    def poll(self):
+        """
+        Returns the stored record if it is newer than the last one applied in
+        this process, else None. The caller must call mark_applied() once the
+        record has been activated; until then the same record is returned
+        again on a later poll (at most every `retry_interval` seconds), unless
+        the caller gives up on it with mark_failed().
+        """
+        stamp = self._stat()
+        if stamp is None:
+            return None
+
+        with self._lock:
+            if stamp == self._stamp:
+                return None
+            if time.monotonic() < self._retry_after:
+                return None
+            record = self._read()
+            if not record or record['generation'] <= self._generation:
+                self._stamp = stamp
+                return None
+            self._retry_after = time.monotonic() + self.retry_interval
+            self._polled = (record['generation'], stamp)
+            return record
+
+    def mark_applied(self, record):
+        self._settle(record)
+
+    def mark_failed(self, record):
+        """Stops retrying `record`; only a newer generation is picked up again."""
+        self._settle(record)
+
+    def _settle(self, record):
+        with self._lock:
+            if record['generation'] > self._generation:
+                self._generation = record['generation']
+            # Remember the file as poll() read it, not as it is now: activation can
+            # take seconds, and a save() by another worker meanwhile must still be seen
+            if self._polled and self._polled[0] == record['generation']:
+                self._stamp = self._polled[1]
+            self._retry_after = 0.0
+        # (generation, stamp) of the record last returned by poll()
+        self._polled = None
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def _read(self):
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (ValueError, OSError) as e:
+            logger.error(f"Failed to read HSM config store: {e}")
+            return None
+
+    @contextmanager
+    def _file_lock(self):
+        with open(f"{self.path}.lock", 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
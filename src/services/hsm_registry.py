@@ -0,0 +1,168 @@
+import threading
+import time
+import logging
+from contextlib import contextmanager
+from .dek_service import DekService
+
+logger = logging.getLogger(__name__)
+
+
+class _RegistryEntry:
+    def __init__(self, key, hsm_type, backend_id, hsm_service):
+        self.key = key
+        self.hsm_type = hsm_type
+        self.backend_id = backend_id
+        self.hsm_service = hsm_service
+        self.dek_service = DekService(hsm_service)
+        self.in_flight = 0
+        self.last_used = time.monotonic()
+
+
+class HsmRegistry:
+    """
+    Keeps initialized HSM backends warm per configuration and swaps the
+    active one atomically. Requests hold on to the entry they acquired, so
+    a switch never pulls a backend out from under an in-flight call.
+    Backends that are neither active nor in use are closed once they have
+    been idle for `idle_timeout` seconds (<= 0 disables eviction).
+    """
+
+    # Config fields left out of backend_id, which is safe to log and persist
+    SECRET_FIELDS = ('pin',)
+
+    def __init__(self, factory, idle_timeout=300.0):
+        self.factory = factory
+        self.idle_timeout = idle_timeout
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._entries = {}
+        self._active = None
+        self._reaper = None
+        self._stop = threading.Event()
+
+    @staticmethod
+    def make_key(hsm_type, config):
+        return (hsm_type,) + tuple(sorted(config.items()))
+
+    @classmethod
+    def make_backend_id(cls, hsm_type, config):
+        """Non-secret identity of a backend, e.g. "LUNA:label=master_key,slot_id=1"."""
+        fields = ','.join(f"{k}={v}" for k, v in sorted(config.items()) if k not in cls.SECRET_FIELDS)
+        return f"{hsm_type}:{fields}"
+
+    @property
+    def active_type(self):
+        active = self._active
+        return active.hsm_type if active else None
+
+    @property
+    def active_backend_id(self):
+        active = self._active
+        return active.backend_id if active else None
+
+    def activate(self, hsm_type, config):
+        """
+        Makes the backend for (hsm_type, config) the active one, reusing a
+        warm instance when one exists. The backend is built outside the main
+        lock so in-flight requests are not blocked while a library loads.
+        """
+        key = self.make_key(hsm_type, config)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry:
+                self._set_active(entry)
+                logger.info(f"Switched to warm {hsm_type} backend")
+                return
+
+        with self._build_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+            if not entry:
+                hsm_service = self.factory(hsm_type, config)
+                entry = _RegistryEntry(key, hsm_type, self.make_backend_id(hsm_type, config), hsm_service)
+                with self._lock:
+                    self._entries[key] = entry
+                logger.info(f"Initialized new {hsm_type} backend")
+
+        with self._lock:
+            self._set_active(entry)
+        self._ensure_reaper()
+
+    def _set_active(self, entry):
+        previous = self._active
+        if previous is not None and previous is not entry:
+            previous.last_used = time.monotonic()
+        entry.last_used = time.monotonic()
+        self._active = entry
+
+    @contextmanager
+    def acquire(self):
+        """
+        Yields the active entry (exposing hsm_type, hsm_service, dek_service)
+        and pins it until the block exits.
+        """
+        with self._lock:
+            entry = self._active
+            if entry is None:
+                raise RuntimeError("No HSM backend is active")
+            entry.in_flight += 1
+        try:
+            yield entry
+        finally:
+            with self._lock:
+                entry.in_flight -= 1
+                entry.last_used = time.monotonic()
+
+    def close_idle(self, now=None):
+        """Closes inactive, unused backends past the idle timeout. Returns the count closed."""
+        if self.idle_timeout <= 0:
+            return 0
+        now = time.monotonic() if now is None else now
+
+        with self._lock:
+            expired = [
+                entry for entry in self._entries.values()
+                if entry is not self._active
+                and entry.in_flight == 0
+                and now - entry.last_used >= self.idle_timeout
+            ]
+            for entry in expired:
+                del self._entries[entry.key]
+
+        for entry in expired:
+            self._close_entry(entry)
+        return len(expired)
+
+    def shutdown(self):
+        self._stop.set()
+        with self._lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+            self._active = None
+        for entry in entries:
+            self._close_entry(entry)
+
+    def _close_entry(self, entry):
+        try:
+            entry.hsm_service.close()
+            logger.info(f"Closed idle {entry.hsm_type} backend")
+        except Exception as e:
+            logger.error(f"Failed to close {entry.hsm_type} backend: {e}")
+
+    def _ensure_reaper(self):
+        if self.idle_timeout <= 0 or self._reaper is not None:
+            return
+        with self._lock:
+            if self._reaper is not None:
+                return
+            self._reaper = threading.Thread(target=self._reap_loop, name="hsm-registry-reaper", daemon=True)
+            self._reaper.start()
+
+    def _reap_loop(self):
+        interval = min(max(self.idle_timeout / 2, 1.0), 30.0)
+        while not self._stop.wait(interval):
+            try:
+                self.close_idle()
+            except Exception as e:
+                logger.error(f"HSM registry reaper failed: {e}")
@@ -1,14 +1,23 @@
 from abc import ABC, abstractmethod
 import os
 import secrets
-from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
-from cryptography.hazmat.backends import default_backend
+import threading
 import logging
-# For Real HSM
-try:
-    import PyKCS11
-except ImportError:
-    PyKCS11 = None
+# cryptography (used by SimulatedHsmService) is resolved lazily as well
+from .file_encryption_service import _load_ciphers
+# For Real HSM. Imported on first use (see _load_pykcs11) so that
+# deployments not using PKCS#11 never pay for loading it.
+PyKCS11 = None
+
+def _load_pykcs11():
+    global PyKCS11
+    if PyKCS11 is None:
+        try:
+            import PyKCS11 as pykcs11_module
+        except ImportError:
+            return None
+        PyKCS11 = pykcs11_module
+    return PyKCS11
 
 
 
@@ -24,11 +33,25 @@ class HsmService(ABC):
     def decrypt_with_kek(self, ciphertext: bytes) -> bytes:
         pass
 
+    def close(self):
+        """Releases any resources held by the backend. No-op by default."""
+        pass
+
 class SimulatedHsmService(HsmService):
     def __init__(self, key_file='simulated_kek.key', key_size=32):
         self.key_file = key_file
         self.key_size = key_size
-        self.kek = self._load_or_generate_kek()
+        self._kek = None
+        self._kek_lock = threading.Lock()
+
+    @property
+    def kek(self):
+        # Loaded on first use, so constructing the backend never touches the key file
+        if self._kek is None:
+            with self._kek_lock:
+                if self._kek is None:
+                    self._kek = self._load_or_generate_kek()
+        return self._kek
 
     def _load_or_generate_kek(self):
         if os.path.exists(self.key_file):
@@ -49,18 +72,22 @@ class SimulatedHsmService(HsmService):
         return kek
 
     def encrypt_with_kek(self, plaintext: bytes) -> bytes:
+        Cipher, algorithms, modes, backend = _load_ciphers()
+
         # Simulate AES-GCM encryption as wrapping
         iv = secrets.token_bytes(12)
         encryptor = Cipher(
             algorithms.AES(self.kek),
             modes.GCM(iv),
-            backend=default_backend()
+            backend=backend
         ).encryptor()
         
         ciphertext = encryptor.update(plaintext) + encryptor.finalize()
         return iv + ciphertext + encryptor.tag
 
     def decrypt_with_kek(self, ciphertext: bytes) -> bytes:
+        Cipher, algorithms, modes, backend = _load_ciphers()
+
         if len(ciphertext) < 28: # IV(12) + Tag(16)
             raise ValueError("Ciphertext too short")
             
@@ -71,7 +98,7 @@ class SimulatedHsmService(HsmService):
         decryptor = Cipher(
             algorithms.AES(self.kek),
             modes.GCM(iv, tag),
-            backend=default_backend()
+            backend=backend
         ).decryptor()
         
         return decryptor.update(actual_ciphertext) + decryptor.finalize()
@@ -81,7 +108,7 @@ class RealHsmService(HsmService):
         self.session = None # Initialize first for safety in __del__
         self.label = label
         
-        if not PyKCS11:
+        if not _load_pykcs11():
             raise ImportError("PyKCS11 is not installed")
         
         if not lib_path:
@@ -116,6 +143,16 @@ class RealHsmService(HsmService):
             except:
                 pass
 
+    def close(self):
+        # Only this session is closed. C_Logout would log out every session this
+        # process has on the token, including other registry backends on the same slot.
+        if self.session:
+            try:
+                self.session.closeSession()
+            except:
+                pass
+            self.session = None
+
     def __del__(self):
         if hasattr(self, 'session') and self.session:
             try:
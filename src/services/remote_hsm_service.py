@@ -2,6 +2,7 @@ import requests
 import base64
 import logging
 from .hsm_service import HsmService
+from .tracing import tracer
 
 logger = logging.getLogger(__name__)
 
@@ -25,8 +26,11 @@ class RemoteHsmService(HsmService):
             plaintext_b64 = base64.b64encode(plaintext).decode('utf-8')
             payload = {'plaintext': plaintext_b64}
             
-            resp = requests.post(f"{self.url}/encrypt", json=payload, cert=self.cert, verify=self.verify, timeout=10)
-            resp.raise_for_status()
+            with tracer.span('remote_hsm.encrypt', url=f"{self.url}/encrypt") as span:
+                resp = requests.post(f"{self.url}/encrypt", json=payload, headers=tracer.inject_headers(),
+                                     cert=self.cert, verify=self.verify, timeout=10)
+                span.set_attribute('status', resp.status_code)
+                resp.raise_for_status()
             
             data = resp.json()
             if 'error' in data:
@@ -43,8 +47,11 @@ class RemoteHsmService(HsmService):
             ciphertext_b64 = base64.b64encode(ciphertext).decode('utf-8')
             payload = {'ciphertext': ciphertext_b64}
             
-            resp = requests.post(f"{self.url}/decrypt", json=payload, cert=self.cert, verify=self.verify, timeout=10)
-            resp.raise_for_status()
+            with tracer.span('remote_hsm.decrypt', url=f"{self.url}/decrypt") as span:
+                resp = requests.post(f"{self.url}/decrypt", json=payload, headers=tracer.inject_headers(),
+                                     cert=self.cert, verify=self.verify, timeout=10)
+                span.set_attribute('status', resp.status_code)
+                resp.raise_for_status()
             
             data = resp.json()
             if 'error' in data:
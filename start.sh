@@ -8,6 +8,6 @@ source venv/bin/activate
 export PYTHONPATH=$PYTHONPATH:$(pwd)
 
 echo "Starting CryptoFileKekPython..."
-nohup python app.py > app.log 2>&1 &
+nohup gunicorn -c gunicorn.conf.py app:app > app.log 2>&1 &
 echo $! > app.pid
 echo "Application started. PID: $(cat app.pid). Logs: app.log"
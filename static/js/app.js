@@ -269,7 +269,7 @@ const Settings = {
         const type = select.value;
         console.log("Settings: Selected Type =", type);
 
-        const isSimulated = (type === 'SIMULATED');
+        const isSimulated = (type === 'SIMULATED' || type === 'EMULATED');
         const isRemote = (type === 'REMOTE');
 
         if (pinInput) pinInput.disabled = isSimulated || isRemote;
@@ -373,7 +373,7 @@ const Settings = {
         console.log("Settings: Saving", { hsmType, pinHasValue: !!pin, label, slotId });
 
         // Validation
-        if (hsmType !== 'SIMULATED' && hsmType !== 'REMOTE' && (!pin || pin.trim() === '')) {
+        if (hsmType !== 'SIMULATED' && hsmType !== 'EMULATED' && hsmType !== 'REMOTE' && (!pin || pin.trim() === '')) {
             errorDiv.textContent = "PIN is required when using HSM.";
             errorDiv.classList.remove('hidden');
             console.warn("Settings: Save aborted - PIN required");
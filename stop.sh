@@ -8,7 +8,7 @@ if [ -f app.pid ]; then
     echo "Stopped."
 else
     echo "app.pid not found. Attempting to find process by name..."
-    if pkill -f "python app.py"; then
+    if pkill -f "gunicorn -c gunicorn.conf.py app:app" || pkill -f "python app.py"; then
         echo "Stopped via pkill."
     else
         echo "No running process found."